@@ -31,6 +31,10 @@ cdef class CubicSpline:
         h1 = 1. / h
         q = rij * h1
 
+        # the derivative vanishes outside the support and at the origin.
+        if (q > 2.0) or (rij <= 1e-12):
+            return 0.0
+
         # get the kernel normalizing factor ( sigma )
         if self.dim == 1:
             fac = self.fac * h1
@@ -41,15 +45,10 @@ cdef class CubicSpline:
 
         # compute sigma * dw_dq
         tmp2 = 2. - q
-        if (rij > 1e-12):
-            if (q > 2.0):
-                val = 0.0
-            elif (q > 1.0):
-                val = -0.75 * tmp2 * tmp2
-            else:
-                val = -3.0 * q * (1 - 0.75 * q)
+        if (q > 1.0):
+            val = -0.75 * tmp2 * tmp2
         else:
-            val = 0.0
+            val = -3.0 * q * (1 - 0.75 * q)
 
         return val * fac
 
@@ -126,6 +125,10 @@ cdef class CubicSpline:
         h1 = 1. / h
         q = rij * h1
 
+        # outside the kernel support, skip the normalization altogether.
+        if (q > 2.0):
+            return 0.0
+
         # get the kernel normalizing factor
         if self.dim == 1:
             fac = self.fac * h1
@@ -135,10 +138,7 @@ cdef class CubicSpline:
             fac = self.fac * h1 * h1 * h1
 
         tmp2 = 2. - q
-        if (q > 2.0):
-            val = 0.0
-
-        elif (q > 1.0):
+        if (q > 1.0):
             val = 0.25 * tmp2 * tmp2 * tmp2
         else:
             val = 1 - 1.5 * q * q * (1 - 0.5 * q)
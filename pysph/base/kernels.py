@@ -70,6 +70,10 @@ class CubicSpline(object):
         h1 = 1. / h
         q = rij * h1
 
+        # outside the kernel support, skip the normalization altogether.
+        if (q > 2.0):
+            return 0.0
+
         # get the kernel normalizing factor
         if self.dim == 1:
             fac = self.fac * h1
@@ -79,10 +83,7 @@ class CubicSpline(object):
             fac = self.fac * h1 * h1 * h1
 
         tmp2 = 2. - q
-        if (q > 2.0):
-            val = 0.0
-
-        elif (q > 1.0):
+        if (q > 1.0):
             val = 0.25 * tmp2 * tmp2 * tmp2
         else:
             val = 1 - 1.5 * q * q * (1 - 0.5 * q)
@@ -100,6 +101,10 @@ class CubicSpline(object):
         h1 = 1. / h
         q = rij * h1
 
+        # the derivative vanishes outside the support and at the origin.
+        if (q > 2.0) or (rij <= 1e-12):
+            return 0.0
+
         # get the kernel normalizing factor ( sigma )
         if self.dim == 1:
             fac = self.fac * h1
@@ -110,15 +115,10 @@ class CubicSpline(object):
 
         # compute sigma * dw_dq
         tmp2 = 2. - q
-        if (rij > 1e-12):
-            if (q > 2.0):
-                val = 0.0
-            elif (q > 1.0):
-                val = -0.75 * tmp2 * tmp2
-            else:
-                val = -3.0 * q * (1 - 0.75 * q)
+        if (q > 1.0):
+            val = -0.75 * tmp2 * tmp2
         else:
-            val = 0.0
+            val = -3.0 * q * (1 - 0.75 * q)
 
         return val * fac
 
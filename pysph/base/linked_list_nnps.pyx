@@ -10,6 +10,7 @@ from cython.parallel import parallel, prange, threadid
 
 # malloc and friends
 from libc.stdlib cimport malloc, free
+from libcpp.algorithm cimport sort
 from libcpp.map cimport map
 from libcpp.pair cimport pair
 from libcpp.vector cimport vector
@@ -21,6 +22,10 @@ from cpython.list cimport PyList_GetItem, PyList_SetItem, PyList_GET_ITEM
 # Cython for compiler directives
 cimport cython
 
+cdef extern from "z_order.h":
+    ctypedef unsigned long long uint64_t
+    uint64_t get_key(uint64_t i, uint64_t j, uint64_t k) nogil
+
 
 #############################################################################
 cdef class LinkedListNNPS(NNPS):
@@ -151,6 +156,15 @@ cdef class LinkedListNNPS(NNPS):
         cdef long cell_index, orig_length
         cid_x = cid_y = cid_z = 0
 
+        # Only the 3**dim ring of cells around the particle needs to be
+        # searched, the remaining shifts can never produce a valid cell
+        # in lower dimensions.
+        cdef int iy_start = 0, iy_stop = 3, iz_start = 0, iz_stop = 3
+        if dim < 3:
+            iz_start = 1; iz_stop = 2
+        if dim < 2:
+            iy_start = 1; iy_stop = 2
+
         # gather search radius
         hi2 = radius_scale * d_h[d_idx]
         hi2 *= hi2
@@ -159,8 +173,8 @@ cdef class LinkedListNNPS(NNPS):
 
         # Begin search through neighboring cells
         for ix in range(3):
-            for iy in range(3):
-                for iz in range(3):
+            for iy in range(iy_start, iy_stop):
+                for iz in range(iz_start, iz_stop):
                     cid_x = _cid_x + shifts[ix]
                     cid_y = _cid_y + shifts[iy]
                     cid_z = _cid_z + shifts[iz]
@@ -198,10 +212,31 @@ cdef class LinkedListNNPS(NNPS):
         cdef UIntArray next = self.nexts[pa_index]
         cdef ZOLTAN_ID_TYPE _next
         indices.reset()
-        cdef long i
-
+        cdef long i, cell_index
+        cdef long ncx = self.ncells_per_dim.data[0]
+        cdef long ncxy = ncx*self.ncells_per_dim.data[1]
+        cdef long ix, iy, iz
+        cdef vector[pair[uint64_t, long]] cells
+
+        # Visit the occupied cells along a Morton (Z-order) curve instead
+        # of the row-major cell order so that particles which are close in
+        # memory are also close in space.  Contiguous chunks of destination
+        # particles then share most of their neighboring cells.
         for i in range(self.n_cells):
-            _next = head.data[i]
+            if head.data[i] != UINT_MAX:
+                cell_index = i
+                iz = cell_index//ncxy
+                cell_index = cell_index - iz*ncxy
+                iy = cell_index//ncx
+                ix = cell_index - iy*ncx
+                cells.push_back(
+                    pair[uint64_t, long](get_key(ix, iy, iz), i)
+                )
+
+        sort(cells.begin(), cells.end())
+
+        for i in range(<long>cells.size()):
+            _next = head.data[cells[i].second]
             while (_next != UINT_MAX):
                 indices.append(<long>_next)
                 _next = next.data[_next]
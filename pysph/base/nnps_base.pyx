@@ -1228,15 +1228,18 @@ cdef class NeighborCache:
         self._update_last_avg_nbr_size()
         cdef int n_threads = self._n_threads
         cdef int dst_index = self._dst_index
-        cdef size_t i
+        cdef long i
         cdef long np = self._particles[dst_index].get_number_of_particles()
         self._start_stop.resize(np*2)
         self._pid_to_tid.resize(np)
         self._cached.resize(np)
-        for i in range(np):
-            self._cached.data[i] = 0
-            self._start_stop.data[2*i] = 0
-            self._start_stop.data[2*i+1] = 0
+        cdef int* cached = self._cached.data
+        cdef unsigned int* start_stop = self._start_stop.data
+        with nogil:
+            for i in prange(np):
+                cached[i] = 0
+                start_stop[2*i] = 0
+                start_stop[2*i+1] = 0
         # This is an upper limit for the number of neighbors in a worst
         # case scenario.
         cdef size_t safety = 1024
@@ -1251,12 +1254,13 @@ cdef class NeighborCache:
     #### Private protocol ################################################
 
     cdef void _update_last_avg_nbr_size(self):
-        cdef size_t i
-        cdef size_t np = self._pid_to_tid.length
-        cdef UIntArray start_stop = self._start_stop
+        cdef long i
+        cdef long np = self._pid_to_tid.length
+        cdef unsigned int* start_stop = self._start_stop.data
         cdef long total = 0
-        for i in range(np):
-            total += start_stop.data[2*i + 1] - start_stop.data[2*i]
+        with nogil:
+            for i in prange(np):
+                total += start_stop[2*i + 1] - start_stop[2*i]
         if total > 0 and np > 0:
             self._last_avg_nbr_size = int(total/np) + 1
 
@@ -1596,18 +1600,13 @@ cdef class NNPS(NNPSBase):
             return
         cdef id_gid_pair_t _entry
         cdef vector[id_gid_pair_t] _data
-        cdef vector[unsigned int] _ids
         cdef int i
         cdef unsigned int _id
 
         if gids[0] == UINT_MAX:
-            # Serial runs will have invalid gids so just compare the ids.
-            _ids.resize(length)
-            for i in range(length):
-                _ids[i] = nbrs[i]
-            sort(_ids.begin(), _ids.end())
-            for i in range(length):
-                nbrs[i] = _ids[i]
+            # Serial runs will have invalid gids so just compare the ids,
+            # these can be sorted in place.
+            sort(nbrs, nbrs + length)
         else:
             # Copy the neighbor id and gid data.
             _data.resize(length)
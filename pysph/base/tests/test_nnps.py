@@ -14,7 +14,7 @@ from pysph.base import nnps
 from compyle.config import get_config
 
 # Carrays from PyZoltan
-from cyarray.carray import UIntArray, IntArray
+from cyarray.carray import UIntArray, IntArray, LongArray
 
 # Python testing framework
 import unittest
@@ -240,6 +240,16 @@ class DictBoxSortNNPS2DTestCase(NNPS2DTestCase):
         self.test_neighbors_bb()
 
 
+class LinkedListNNPS2DTestCase(DictBoxSortNNPS2DTestCase):
+    """Test for the linked list algorithm in 2D"""
+
+    def setUp(self):
+        NNPS2DTestCase.setUp(self)
+        self.nps = nnps.LinkedListNNPS(
+            dim=2, particles=self.particles, radius_scale=2.0
+        )
+
+
 class OctreeGPUNNPS2DTestCase(DictBoxSortNNPS2DTestCase):
     """Test for Z-Order SFC based OpenCL algorithm"""
 
@@ -941,6 +951,27 @@ class LinkedListNNPSTestCase(DictBoxSortNNPSTestCase):
             self.assertTrue(cid.y > -1)
             self.assertTrue(cid.z > -1)
 
+    def test_spatially_ordered_indices_is_a_permutation(self):
+        nps = self.nps
+        for pa_index, pa in enumerate(self.particles):
+            indices = LongArray()
+            nps.get_spatially_ordered_indices(pa_index, indices)
+            n = pa.get_number_of_particles()
+            self.assertListEqual(
+                sorted(indices.get_npy_array().tolist()), list(range(n))
+            )
+
+
+class LinkedListNNPSWithSortingTestCase(DictBoxSortNNPSTestCase):
+    def setUp(self):
+        NNPSTestCase.setUp(self)
+        self.nps = nnps.LinkedListNNPS(
+            dim=3, particles=self.particles, radius_scale=2.0
+        )
+        self.nps.spatially_order_particles(0)
+        self.nps.spatially_order_particles(1)
+        self.nps.update()
+
 
 class TestNNPSOnLargeDomain(unittest.TestCase):
     def _make_particles(self, nx=20):
@@ -109,10 +109,10 @@ class CircularDroplet(Application):
             y = y.ravel()
             volume = dx*dx
 
-        m = numpy.ones_like(x) * volume * rho0
-        rho = numpy.ones_like(x) * rho0
-        h = numpy.ones_like(x) * h0
-        cs = numpy.ones_like(x) * c0
+        m = numpy.full_like(x, volume * rho0)
+        rho = numpy.full_like(x, rho0)
+        h = numpy.full_like(x, h0)
+        cs = numpy.full_like(x, c0)
 
         # additional properties required for the fluid.
         additional_props = [
@@ -152,9 +152,8 @@ class CircularDroplet(Application):
             additional_props=additional_props)
 
         # set the color of the inner circle
-        for i in range(x.size):
-            if (((fluid.x[i]-0.5)**2 + (fluid.y[i]-0.5)**2) <= 0.25**2):
-                fluid.color[i] = 1.0
+        inside = ((fluid.x - 0.5)**2 + (fluid.y - 0.5)**2) <= 0.25**2
+        fluid.color[inside] = 1.0
 
         # particle volume
         fluid.V[:] = 1./volume
@@ -113,10 +113,10 @@ class SquareDroplet(Application):
         x = x.ravel()
         y = y.ravel()
 
-        m = numpy.ones_like(x) * volume * rho0
-        rho = numpy.ones_like(x) * rho0
-        h = numpy.ones_like(x) * h0
-        cs = numpy.ones_like(x) * c0
+        m = numpy.full_like(x, volume * rho0)
+        rho = numpy.full_like(x, rho0)
+        h = numpy.full_like(x, h0)
+        cs = numpy.full_like(x, c0)
 
         # additional properties required for the fluid.
         additional_props = [
@@ -154,10 +154,9 @@ class SquareDroplet(Application):
             additional_props=additional_props)
 
         # set the color of the inner square
-        for i in range(x.size):
-            if ((fluid.x[i] > 0.35) and (fluid.x[i] < 0.65)):
-                if ((fluid.y[i] > 0.35) and (fluid.y[i] < 0.65)):
-                    fluid.color[i] = 1.0
+        inside = ((fluid.x > 0.35) & (fluid.x < 0.65) &
+                  (fluid.y > 0.35) & (fluid.y < 0.65))
+        fluid.color[inside] = 1.0
 
         # particle volume
         fluid.V[:] = 1./volume
@@ -130,28 +130,24 @@ class MegaGroup(object):
         if group.has_subgroups:
             return [MegaGroup(g, self.Group) for g in equations]
 
-        dest_list = []
+        # Bucket the equations by destination in a single pass, this keeps
+        # the order in which the destinations and equations are defined.
+        dests = OrderedDict()
         for equation in equations:
             dest = equation.dest
-            if dest not in dest_list:
-                dest_list.append(dest)
-
-        dests = OrderedDict()
-        for dest in dest_list:
-            sources = defaultdict(list)
-            eqs_with_no_source = []
-            all_equations = []
-            for equation in equations:
-                if equation.dest != dest:
-                    continue
-                if equation not in all_equations:
-                    all_equations.append(equation)
-                if equation.no_source:
-                    eqs_with_no_source.append(equation)
-                else:
-                    for src in equation.sources:
-                        sources[src].append(equation)
+            if dest not in dests:
+                dests[dest] = ([], defaultdict(list), [])
+            eqs_with_no_source, sources, all_equations = dests[dest]
+            if equation not in all_equations:
+                all_equations.append(equation)
+            if equation.no_source:
+                eqs_with_no_source.append(equation)
+            else:
+                for src in equation.sources:
+                    sources[src].append(equation)
 
+        for dest in dests:
+            eqs_with_no_source, sources, all_equations = dests[dest]
             for src in sources:
                 eqs = sources[src]
                 sources[src] = self.Group(eqs)
@@ -1,11 +1,11 @@
 # Automatically generated, do not edit.
 # cython: cdivision=True, language_level=3
 # distutils: language=c++
-<%def name="indent(text, level=0)" buffered="True">
-% for l in text.splitlines():
-${' '*4*level}${l}
-% endfor
-</%def>
+<%!
+def indent(text, level=0):
+    prefix = ' '*4*level
+    return '\n' + ''.join(prefix + l + '\n' for l in text.splitlines())
+%>
 
 <%def name="do_group(helper, group, level=0)" buffered="True">
 #######################################################################
@@ -89,6 +89,10 @@ ${helper.get_parallel_block()}
         ${indent(eq_group.get_loop_all_code(helper.object.kernel), 2)}
 % endif
 % if eq_group.has_loop():
+<% hoisted_setup = eq_group.get_hoisted_array_setup() %>\
+% if hoisted_setup:
+        ${indent(hoisted_setup, 2)}
+% endif
         for nbr_idx in range(N_NBRS):
             s_idx = <long>(NBRS[nbr_idx])
             ###########################################################
@@ -96,6 +100,10 @@ ${helper.get_parallel_block()}
             ###########################################################
             ${indent(eq_group.get_loop_code(helper.object.kernel), 3)}
 % endif ## if has_loop
+<% fused_code = helper.get_fused_code(group, source) %>\
+% if fused_code:
+        ${indent(fused_code, 2)}
+% endif
 % endif ## if eq_group.has_loop() or has_loop_all():
 # Source ${source} done.
 # --------------------------------------
@@ -107,6 +115,10 @@ ${helper.get_parallel_block()}
 # Post loop for destination ${dest}.
 for d_idx in ${helper.get_parallel_range(group)}:
     ${indent(all_eqs.get_post_loop_code(helper.object.kernel), 1)}
+<% fused_code = helper.get_fused_code(group, 'post_loop') %>\
+% if fused_code:
+    ${indent(fused_code, 1)}
+% endif
 % endif
 
 ###################################################################
@@ -140,6 +152,7 @@ ${indent(helper.get_post_call(group), 0)}
 from libc.stdio cimport printf
 from libc.math cimport *
 from libc.math cimport fabs as abs
+cimport cython
 cimport numpy
 import numpy
 from cython import address
@@ -179,7 +192,7 @@ cdef class ParticleArrayWrapper:
     cpdef set_array(self, pa):
         self.array = pa
         props = set(pa.properties.keys())
-        props = props.union(['tag', 'pid', 'gid'])
+        props.update(('tag', 'pid', 'gid'))
         for prop in props:
             setattr(self, prop, pa.get_carray(prop))
         for prop in pa.constants.keys():
@@ -242,6 +255,8 @@ cdef class AccelerationEval:
             name = pa.name
             getattr(self, name).set_array(pa)
 
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
     cpdef compute(self, double t, double dt):
         cdef long nbr_idx, NP_SRC, NP_DEST, D_START_IDX
         cdef long s_idx, d_idx
@@ -272,7 +287,9 @@ cdef class AccelerationEval:
         ## all_eqs is a Group of all equations having this destination.
         #######################################################################
         % for g_idx, group in enumerate(helper.object.mega_groups):
-        % if len(group.data) > 0: # No equations in this group.
+        % if helper.is_fused(group):
+        # Group ${g_idx} is done along with Group ${g_idx - 1}.
+        % elif len(group.data) > 0: # No equations in this group.
         # ---------------------------------------------------------------------
         # Group ${g_idx}.
         % if group.condition is not None:
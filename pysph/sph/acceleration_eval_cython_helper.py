@@ -1,5 +1,8 @@
+import ast
 from collections import defaultdict
+import inspect
 from os.path import dirname, join, expanduser, realpath
+import re
 from textwrap import dedent
 
 from mako.template import Template
@@ -10,8 +13,25 @@ from compyle.cython_generator import (CythonGenerator, KnownType,
                                       get_parallel_range)
 from compyle.ext_module import ExtModule, get_platform_dir
 
+from .equation import get_method_args
+
 
 ###############################################################################
+_template_cache = {}
+
+
+def get_template(path):
+    """Return the Mako template in the given file.
+
+    Compiling a template is expensive, so the compiled template is cached.
+    """
+    template = _template_cache.get(path)
+    if template is None:
+        template = Template(filename=path)
+        _template_cache[path] = template
+    return template
+
+
 def get_cython_code(obj):
     """This function looks at the object and gets any additional code to
     wrap from either the `_cython_code_` method or the `_get_helpers_` method.
@@ -36,6 +56,40 @@ def get_helper_code(helpers):
     return result
 
 
+def only_indexes_with_d_idx(method):
+    """Return True if the given method accesses the particle arrays (the
+    `d_*` and `s_*` arguments) only at `d_idx`.
+
+    This is determined from the source of the method, if the source is not
+    available it returns False.
+    """
+    try:
+        tree = ast.parse(dedent(inspect.getsource(method)))
+    except (IOError, OSError, TypeError, SyntaxError):
+        return False
+
+    def _is_array(node):
+        return (isinstance(node, ast.Name) and node.id != 'd_idx' and
+                node.id.startswith(('d_', 's_')))
+
+    indexed = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Subscript) and _is_array(node.value):
+            index = node.slice
+            if isinstance(index, ast.Index):
+                index = index.value
+            if not (isinstance(index, ast.Name) and index.id == 'd_idx'):
+                return False
+            indexed.add(node.value)
+
+    # Any other use of an array, for example passing it on to a function or
+    # aliasing it, could access it at any index.
+    for node in ast.walk(tree):
+        if _is_array(node) and node not in indexed:
+            return False
+    return True
+
+
 ###############################################################################
 def get_all_array_names(particle_arrays):
     """For each type of carray, find the union of the names of all particle
@@ -122,6 +176,7 @@ class AccelerationEvalCythonHelper(object):
         self._ext_mod = None
         self._module = None
         self._compute_group_map()
+        self._compute_fused_groups()
 
     ##########################################################################
     # Private interface.
@@ -140,12 +195,125 @@ class AccelerationEvalCythonHelper(object):
                     mapping[sub_group] = code
         self._group_map = mapping
 
+    def _specialize_kernel_code(self, code):
+        """Replace the numeric attributes of the kernel, like `self.dim` and
+        `self.fac`, with their values in the given kernel code so that the C
+        compiler can fold the branches on the dimension and the constants.
+        Attributes that the code assigns to are left alone.
+        """
+        for name, value in sorted(self.object.kernel.__dict__.items()):
+            if isinstance(value, bool) or \
+               not isinstance(value, (int, float)):
+                continue
+            attr = r'\bself\.%s\b' % name
+            if re.search(attr + r'\s*[-+*/]?=(?!=)', code) is not None:
+                continue
+            if isinstance(value, float):
+                value = float(value)
+            code = re.sub(attr, repr(value), code)
+        return code
+
+    def _get_source_groups(self):
+        # Return all the groups of equations with a source, in all the
+        # destinations of all the groups.
+        result = []
+        todo = list(self.object.mega_groups)
+        while len(todo) > 0:
+            group = todo.pop(0)
+            if group.has_subgroups:
+                todo.extend(group.data)
+            else:
+                for dest, (_, sources, _) in group.data.items():
+                    result.extend(sources.values())
+        return result
+
+    def _compute_fused_groups(self):
+        # A group that only has destination-only loops, like an equation of
+        # state, is merged into the last pass over the destination of the
+        # group just before it, when that is safe, to avoid another pass.
+        self._fused = {}
+        self._fused_into = {}
+        groups = self.object.mega_groups
+        for leader, follower in zip(groups, groups[1:]):
+            if leader in self._fused_into:
+                continue
+            fused = self._get_fused_equations(leader, follower)
+            if fused is not None:
+                self._fused[leader] = fused
+                self._fused_into[follower] = leader
+
+    def _get_fused_equations(self, leader, follower):
+        """Return `(where, equations)` if the equations of the `follower`
+        group can be run along with the last pass over the destination of the
+        `leader` group, else return None.
+
+        `where` is 'post_loop' if the equations are to be run after the
+        post_loop of the leader, else it is the name of the last source of
+        the leader after whose neighbor loop the equations are run.
+
+        This requires both groups to be plain groups with a single and
+        identical destination and range of particles.  The follower may only
+        have `loop` methods without any sources that access the arrays at
+        `d_idx`.  If they are run after the leader's post_loop, the post_loop
+        may also only access the arrays at `d_idx`.  If they are run in the
+        neighbor loop, the leader may not use the follower's properties from
+        any of its sources.
+        """
+        for group in (leader, follower):
+            if (group.has_subgroups or group.iterate or group.update_nnps or
+                    group.condition is not None or len(group.data) != 1):
+                return None
+        if (leader.post is not None or follower.pre is not None or
+                follower.post is not None):
+            return None
+        props = ('real', 'start_idx', 'stop_idx')
+        if any(getattr(leader, x) != getattr(follower, x) for x in props):
+            return None
+
+        dest, (_, sources, leader_eqs) = list(leader.data.items())[0]
+        f_dest, (f_eqs, f_sources, f_all_eqs) = \
+            list(follower.data.items())[0]
+        if f_dest != dest or len(f_sources) > 0 or leader_eqs.has_reduce():
+            return None
+        if (not f_eqs.has_loop() or f_eqs.has_initialize() or
+                f_eqs.has_post_loop() or f_eqs.has_reduce()):
+            return None
+
+        allowed = ('self', 'd_idx', 't', 'dt')
+        for equation in f_eqs.equations:
+            if hasattr(equation, 'py_initialize'):
+                return None
+            for arg in get_method_args(equation.loop):
+                if arg not in allowed and not arg.startswith('d_'):
+                    return None
+            if not only_indexes_with_d_idx(equation.loop):
+                return None
+
+        if leader_eqs.has_post_loop():
+            for equation in leader_eqs.equations:
+                if hasattr(equation, 'post_loop') and \
+                   not only_indexes_with_d_idx(equation.post_loop):
+                    return None
+            return 'post_loop', f_eqs
+
+        if len(sources) == 0:
+            return None
+        last_source = list(sources.keys())[-1]
+        last_group = sources[last_source]
+        if not (last_group.has_loop() or last_group.has_loop_all()):
+            return None
+        f_props = set(x[2:] for x in f_eqs.get_array_names()[1])
+        s_props = set(x[2:] for x in leader_eqs.get_array_names()[0])
+        if f_props & s_props:
+            return None
+        return last_source, f_eqs
+
     ##########################################################################
     # Public interface.
     ##########################################################################
     def get_code(self):
         path = join(dirname(__file__), 'acceleration_eval_cython.mako')
-        template = Template(filename=path)
+        template = get_template(path)
         main = template.render(helper=self)
         return main
 
@@ -197,11 +365,13 @@ class AccelerationEvalCythonHelper(object):
             helpers.extend(object.kernel._get_helpers_())
 
         # get headers from the Equations
+        seen = set(helpers)
         for equation in object.all_group.equations:
             headers.extend(get_cython_code(equation))
             if hasattr(equation, '_get_helpers_'):
                 for helper in equation._get_helpers_():
-                    if helper not in helpers:
+                    if helper not in seen:
+                        seen.add(helper)
                         helpers.append(helper)
 
         headers.extend(get_helper_code(helpers))
@@ -209,7 +379,7 @@ class AccelerationEvalCythonHelper(object):
         # Kernel wrappers.
         cg = CythonGenerator(known_types=self.known_types)
         cg.parse(object.kernel)
-        headers.append(cg.get_code())
+        headers.append(self._specialize_kernel_code(cg.get_code()))
 
         # Equation wrappers.
         self.known_types['SPH_KERNEL'] = KnownType(
@@ -241,9 +411,21 @@ class AccelerationEvalCythonHelper(object):
     def get_variable_declarations(self):
         group = self.object.all_group
         ctx = group.context
-        return group.get_variable_declarations(ctx)
+        decl = [group.get_variable_declarations(ctx)]
+        hoisted = set()
+        for eq_group in self._get_source_groups():
+            hoisted.update(
+                eq_group.get_hoisted_array_declarations(self.known_types)
+            )
+        decl.extend(sorted(hoisted))
+        return '\n'.join(decl)
 
     def get_array_declarations(self):
+        # The particle properties are declared as raw pointers and not typed
+        # memoryviews.  The generated equation and kernel functions take
+        # pointer arguments, and setting a pointer from a carray's data is
+        # free, whereas acquiring a memoryview is a Python-level operation
+        # for every array of every group on each call to compute.
         group = self.object.all_group
         src, dest = group.get_array_names()
         src.update(dest)
@@ -251,22 +433,20 @@ class AccelerationEvalCythonHelper(object):
 
     def get_dest_array_setup(self, dest_name, eqs_with_no_source, sources,
                              group):
-        src, dest_arrays = eqs_with_no_source.get_array_names()
-        for g in sources.values():
-            s, d = g.get_array_names()
-            dest_arrays.update(d)
+        dest_arrays = eqs_with_no_source.get_array_names()[1].union(
+            *[g.get_array_names()[1] for g in sources.values()]
+        )
+        if group in self._fused:
+            dest_arrays.update(self._fused[group][1].get_array_names()[1])
         if isinstance(group.start_idx, str):
-            lines = ['D_START_IDX = self.%s.%s[0]' %
-                     (dest_name, group.start_idx)]
+            lines = ['D_START_IDX = dst.%s.data[0]' % group.start_idx]
         else:
             lines = ['D_START_IDX = %s' % group.start_idx]
 
         if group.stop_idx is None:
-            lines += ['NP_DEST = self.%s.size(real=%s)' %
-                      (dest_name, group.real)]
+            lines += ['NP_DEST = dst.size(real=%s)' % group.real]
         elif isinstance(group.stop_idx, str):
-            lines += ['NP_DEST = self.%s.%s[0]' %
-                      (dest_name, group.stop_idx)]
+            lines += ['NP_DEST = dst.%s.data[0]' % group.stop_idx]
         else:
             lines += ['NP_DEST = %s' % group.stop_idx]
 
@@ -276,11 +456,27 @@ class AccelerationEvalCythonHelper(object):
 
     def get_src_array_setup(self, src_name, eq_group):
         src_arrays, dest = eq_group.get_array_names()
-        lines = ['NP_SRC = self.%s.size()' % src_name]
+        lines = ['NP_SRC = src.size()']
         lines += ['%s = src.%s.data' % (n, n[2:])
                   for n in sorted(src_arrays)]
         return '\n'.join(lines)
 
+    def get_fused_code(self, group, where):
+        """Return the code for the equations of the next group that are
+        run in the given group at `where`, which is either 'post_loop' or the
+        name of a source.  Returns an empty string if there are none.
+        """
+        fused_where, eqs = self._fused.get(group, (None, None))
+        if fused_where != where:
+            return ''
+        code = eqs.get_loop_code(self.object.kernel)
+        return '# Equations fused from the next group.\n' + code
+
+    def is_fused(self, group):
+        """Return True if the group is run as part of the previous group.
+        """
+        return group in self._fused_into
+
     def get_parallel_block(self):
         if self.config.use_openmp:
             return "with nogil, parallel():"
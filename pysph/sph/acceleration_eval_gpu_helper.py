@@ -72,7 +72,6 @@ idea is very simple.
 
 '''
 from functools import partial
-import inspect
 import os
 import re
 import sys
@@ -92,16 +91,11 @@ from compyle.config import get_config
 from compyle.translator import (CStructHelper, CUDAConverter, OpenCLConverter,
                                 ocl_detect_type, ocl_detect_pointer_base_type)
 
-from .equation import get_predefined_types, KnownType
+from .equation import get_method_args, get_predefined_types, KnownType
 from .acceleration_eval_cython_helper import (
-    get_all_array_names, get_known_types_for_arrays
+    get_all_array_names, get_known_types_for_arrays, get_template
 )
 
-getfullargspec = getattr(
-    inspect, 'getfullargspec', inspect.getargspec
-)
-
-
 def get_converter(backend):
     if backend == 'opencl':
         Converter = OpenCLConverter
@@ -595,7 +589,7 @@ class AccelerationEvalGPUHelper(object):
     def get_code(self):
         path = os.path.join(os.path.dirname(__file__),
                             'acceleration_eval_gpu.mako')
-        template = Template(filename=path)
+        template = get_template(path)
         main = template.render(helper=self)
         if self.backend == 'opencl':
             from pyopencl._cluda import CLUDA_PREAMBLE
@@ -777,7 +771,7 @@ class AccelerationEvalGPUHelper(object):
                 )
                 all_args.append(arg)
                 py_args.append(eq.var_name)
-                call_args = list(getfullargspec(method).args)
+                call_args = get_method_args(method)
                 if 'self' in call_args:
                     call_args.remove('self')
                 call_args.insert(0, eq.var_name)
@@ -17,6 +17,7 @@ import inspect
 import itertools
 import numpy
 from textwrap import dedent, wrap
+from weakref import WeakKeyDictionary
 
 from compyle.api import (CythonGenerator, KnownType,
                          OpenCLConverter, get_symbols)
@@ -24,19 +25,46 @@ from compyle.translator import CUDAConverter
 from compyle.config import get_config
 
 
-getfullargspec = getattr(
-    inspect, 'getfullargspec', inspect.getargspec
-)
+try:
+    getfullargspec = inspect.getfullargspec
+except AttributeError:
+    # Python 2.x
+    getfullargspec = inspect.getargspec
+
+# Maps the underlying function of an equation method to its argument names.
+_method_args_cache = WeakKeyDictionary()
+
+
+def get_method_args(method):
+    """Return a list of the argument names of the given (bound) method.
+
+    The code generators look up the signatures of the equation methods many
+    times, so the result is cached on the underlying function.
+    """
+    func = getattr(method, '__func__', method)
+    args = _method_args_cache.get(func)
+    if args is None:
+        args = getfullargspec(method).args
+        _method_args_cache[func] = args
+    return list(args)
+
+
+# Maps class names to the names used for their instances.
+_underscore_names = {}
 
 
 def camel_to_underscore(name):
     """Given a CamelCase name convert it to a name with underscores,
     i.e. camel_case.
     """
-    # From stackoverflow: :P
-    # http://stackoverflow.com/questions/1175208/elegant-python-function-to-convert-camelcase-to-camel-case
-    s1 = re.sub(r'(.)([A-Z][a-z]+)', r'\1_\2', name)
-    return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
+    result = _underscore_names.get(name)
+    if result is None:
+        # From stackoverflow: :P
+        # http://stackoverflow.com/questions/1175208/elegant-python-function-to-convert-camelcase-to-camel-case
+        s1 = re.sub(r'(.)([A-Z][a-z]+)', r'\1_\2', name)
+        result = re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
+        _underscore_names[name] = result
+    return result
 
 
 def indent(text, prefix='    '):
@@ -336,16 +364,34 @@ def sort_precomputed(precomputed, all_pre_comp):
     return result
 
 
+def _get_ignored_variable_names():
+    import math
+    # Math functions.
+    ignore = set(x for x in dir(math) if not x.startswith('_')
+                 and callable(getattr(math, x)))
+    # Older Python's don't have gamma/lgamma.
+    ignore.difference_update(('gamma', 'lgamma'))
+    ignore.update(('KERNEL', 'GRADIENT', 's_idx', 'd_idx'))
+    return frozenset(ignore)
+
+
+_ignored_variable_names = _get_ignored_variable_names()
+
+
+# The types of the symbols available to all equations.
+_predefined_types = {'dt': 0.0,
+                     't': 0.0,
+                     'dst': KnownType('object'),
+                     'NBRS': KnownType('unsigned int*'),
+                     'N_NBRS': KnownType('int'),
+                     'src': KnownType('ParticleArrayWrapper')}
+
+
 def get_predefined_types(precomp):
     """Return a dictionary that can be used by a CythonGenerator for
     the precomputed symbols.
     """
-    result = {'dt': 0.0,
-              't': 0.0,
-              'dst': KnownType('object'),
-              'NBRS': KnownType('unsigned int*'),
-              'N_NBRS': KnownType('int'),
-              'src': KnownType('ParticleArrayWrapper')}
+    result = dict(_predefined_types)
     for sym, value in precomp.items():
         result[sym] = value.context[sym]
     return result
@@ -362,7 +408,7 @@ def get_arrays_used_in_equation(equation):
     for meth_name in methods:
         meth = getattr(equation, meth_name, None)
         if meth is not None:
-            args = getfullargspec(meth).args
+            args = get_method_args(meth)
             s, d = get_array_names(args)
             src_arrays.update(s)
             dest_arrays.update(d)
@@ -578,7 +624,7 @@ class Group(object):
         all_args = set()
         for equation in self.equations:
             if hasattr(equation, 'loop'):
-                args = getfullargspec(equation.loop).args
+                args = get_method_args(equation.loop)
                 all_args.update(args)
         all_args.discard('self')
 
@@ -657,24 +703,10 @@ class Group(object):
         for cb in self.precomputed.values():
             all_vars.update(cb.symbols)
 
-        # Filter out all arrays.
-        filtered_vars = [x for x in all_vars
-                         if not x.startswith(('s_', 'd_'))]
-        # Filter other things.
-        ignore = ['KERNEL', 'GRADIENT', 's_idx', 'd_idx']
-        # Math functions.
-        import math
-        ignore += [x for x in dir(math) if not x.startswith('_')
-                   and callable(getattr(math, x))]
-        try:
-            ignore.remove('gamma')
-            ignore.remove('lgamma')
-        except ValueError:
-            # Older Python's don't have gamma/lgamma.
-            pass
-        filtered_vars = [x for x in filtered_vars if x not in ignore]
-
-        return filtered_vars
+        # Filter out all arrays and other things in a single pass.
+        ignore = _ignored_variable_names
+        return [x for x in all_vars
+                if not x.startswith(('s_', 'd_')) and x not in ignore]
 
     def has_initialize(self):
         return self._has_code('initialize')
@@ -696,9 +728,38 @@ class Group(object):
 
 
 class CythonGroup(Group):
+    # Matches destination array accesses at d_idx, like d_h[d_idx].
+    _d_idx_access = re.compile(r'\b(d_\w+)\[d_idx\]')
+
+    # The kernel symbols in the precomputed code and their replacements.
+    _kernel_funcs = {
+        'KERNEL': 'self.kernel.kernel',
+        'DWDQ': 'self.kernel.dwdq',
+        'GRADIENT': 'self.kernel.gradient',
+        'GRADH': 'self.kernel.gradient_h',
+        'DELTAP': 'self.kernel.get_deltap()',
+    }
+    _kernel_symbols = re.compile(
+        r'\b(%s)\b' % '|'.join(sorted(_kernel_funcs))
+    )
+
     ##########################################################################
     # Non-public interface.
     ##########################################################################
+    def _get_hoisted_arrays(self):
+        """Return the destination arrays read at `d_idx` by the precomputed
+        symbols which are not passed to any of the loops.  These cannot
+        change in the neighbor loop, so they are read once per destination
+        particle instead of once per neighbor.
+        """
+        names = set()
+        for cb in getattr(self, 'precomputed', {}).values():
+            names.update(self._d_idx_access.findall(cb.code))
+        for equation in self.equations:
+            if hasattr(equation, 'loop'):
+                names.difference_update(get_method_args(equation.loop))
+        return sorted(names)
+
     def _get_variable_decl(self, context, mode='declare'):
         decl = []
         names = list(context.keys())
@@ -742,12 +803,19 @@ class CythonGroup(Group):
             if len(pre) > 0:
                 pre.extend(['', ''])
         preamble = self._set_kernel('\n'.join(pre), kernel)
+        hoisted = self._get_hoisted_arrays() if kind == 'loop' else []
+        if len(hoisted) > 0:
+            preamble = self._d_idx_access.sub(
+                lambda m: '_' + m.group(1) if m.group(1) in hoisted
+                else m.group(0),
+                preamble
+            )
 
         code = []
         for eq in self.equations:
             meth = getattr(eq, kind, None)
             if meth is not None:
-                args = getfullargspec(meth).args
+                args = get_method_args(meth)
                 if 'self' in args:
                     args.remove('self')
                 if 'SPH_KERNEL' in args:
@@ -764,15 +832,10 @@ class CythonGroup(Group):
 
     def _set_kernel(self, code, kernel):
         if kernel is not None:
-            k_func = 'self.kernel.kernel'
-            w_func = 'self.kernel.dwdq'
-            g_func = 'self.kernel.gradient'
-            h_func = 'self.kernel.gradient_h'
-            deltap = 'self.kernel.get_deltap()'
-            code = code.replace('DELTAP', deltap)
-            return code.replace('GRADIENT', g_func).replace(
-                'KERNEL', k_func
-            ).replace('GRADH', h_func).replace('DWDQ', w_func)
+            kernel_funcs = self._kernel_funcs
+            return self._kernel_symbols.sub(
+                lambda m: kernel_funcs[m.group(0)], code
+            )
         else:
             return code
 
@@ -793,6 +856,22 @@ class CythonGroup(Group):
     def get_variable_declarations(self, context):
         return self._get_variable_decl(context, mode='declare')
 
+    def get_hoisted_array_declarations(self, known_types={}):
+        decl = []
+        for arr in self._get_hoisted_arrays():
+            if arr in known_types:
+                c_type = known_types[arr].type.rstrip('*')
+            else:
+                c_type = 'double'
+            decl.append('cdef {type} _{arr}'.format(type=c_type, arr=arr))
+        return decl
+
+    def get_hoisted_array_setup(self):
+        return '\n'.join(
+            '_{arr} = {arr}[d_idx]'.format(arr=arr)
+            for arr in self._get_hoisted_arrays()
+        )
+
     def get_variable_array_setup(self):
         names = list(self.context.keys())
         names.sort()
@@ -1,11 +1,11 @@
 # Automatically generated, do not edit.
 # cython: cdivision=True, language_level=3
 # distuils: language=c++
-<%def name="indent(text, level=0)" buffered="True">
-% for l in text.splitlines():
-${' '*4*level}${l}
-% endfor
-</%def>
+<%!
+def indent(text, level=0):
+    prefix = ' '*4*level
+    return '\n' + ''.join(prefix + l + '\n' for l in text.splitlines())
+%>
 
 from libc.math cimport *
 
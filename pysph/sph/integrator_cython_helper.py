@@ -9,18 +9,19 @@ from the `sph_eval` module.
 import inspect
 from os.path import join, dirname
 from textwrap import dedent
-from mako.template import Template
 
 # Local imports.
 from pysph.sph.equation import get_array_names
-from .acceleration_eval_cython_helper import get_helper_code
+from .acceleration_eval_cython_helper import get_helper_code, get_template
 from compyle.api import CythonGenerator, get_func_definition
 from compyle.cython_generator import get_parallel_range
 
 
-getfullargspec = getattr(
-    inspect, 'getfullargspec', inspect.getargspec
-)
+try:
+    getfullargspec = inspect.getfullargspec
+except AttributeError:
+    # Python 2.x
+    getfullargspec = inspect.getargspec
 
 
 class IntegratorCythonHelper(object):
@@ -37,7 +38,7 @@ class IntegratorCythonHelper(object):
     def get_code(self):
         if self.object is not None:
             path = join(dirname(__file__), 'integrator_cython.mako')
-            template = Template(filename=path)
+            template = get_template(path)
             return template.render(helper=self)
         else:
             return ''
@@ -234,6 +234,19 @@ class DumbEquation(Equation):
         dst.reduce_calls[0] = dst.reduce_calls[0] + 1
 
 
+class SumMass(Equation):
+    def initialize(self, d_idx, d_au):
+        d_au[d_idx] = 0.0
+
+    def loop(self, d_idx, d_au, s_idx, s_m):
+        d_au[d_idx] += s_m[s_idx]
+
+
+class ScaleEquation(Equation):
+    def loop(self, d_idx, d_u, d_au, d_av):
+        d_av[d_idx] = 2.0*d_u[d_idx] + d_au[d_idx]
+
+
 class InitializePair(Equation):
     def initialize_pair(self, d_idx, d_u, s_u):
         # Will only work if the source/destinations are the same
@@ -272,6 +285,37 @@ class TestMegaGroup(unittest.TestCase):
         expect = ['SimpleEquation', 'DummyEquation', 'MixedTypeEquation']
         self.assertEqual(f_eqs, expect)
 
+    def test_group_with_interleaved_destinations(self):
+        # Given
+        group = Group(equations=[
+            SimpleEquation(dest='f', sources=['s']),
+            DummyEquation(dest='s', sources=None),
+            MixedTypeEquation(dest='f', sources=None),
+            SimpleEquation(dest='s', sources=['f']),
+        ])
+
+        # When
+        mg = MegaGroup(group, CythonGroup)
+
+        # Then
+        data = mg.data
+        self.assertEqual(list(data.keys()), ['f', 's'])
+
+        eqs_with_no_source, sources, all_eqs = data['f']
+        all_eqs_order = [x.__class__.__name__ for x in all_eqs.equations]
+        self.assertEqual(all_eqs_order,
+                         ['SimpleEquation', 'MixedTypeEquation'])
+        no_src = [x.__class__.__name__ for x in eqs_with_no_source.equations]
+        self.assertEqual(no_src, ['MixedTypeEquation'])
+        self.assertEqual(list(sources.keys()), ['s'])
+
+        eqs_with_no_source, sources, all_eqs = data['s']
+        all_eqs_order = [x.__class__.__name__ for x in all_eqs.equations]
+        self.assertEqual(all_eqs_order, ['DummyEquation', 'SimpleEquation'])
+        no_src = [x.__class__.__name__ for x in eqs_with_no_source.equations]
+        self.assertEqual(no_src, ['DummyEquation'])
+        self.assertEqual(list(sources.keys()), ['f'])
+
     def test_mega_group_copies_props_of_group(self):
         # Given
         def nothing():
@@ -639,6 +683,42 @@ class TestAccelerationEval1D(unittest.TestCase):
         self.assertListEqual(list(pa.au), list(expect))
 
 
+    def test_group_fused_with_post_loop_of_previous_group(self):
+        # Given
+        pa = self.pa
+        equations = [
+            Group(equations=[SimpleEquation(dest='fluid', sources=['fluid'])]),
+            Group(equations=[ScaleEquation(dest='fluid', sources=None)]),
+        ]
+        a_eval = self._make_accel_eval(equations)
+
+        # When
+        a_eval.compute(0.1, 0.1)
+
+        # Then
+        expect = np.asarray([3., 4., 5., 5., 5., 5., 5., 5., 4., 3.])
+        self.assertListEqual(list(pa.u), list(expect))
+        self.assertListEqual(list(pa.av), list(3*expect))
+
+    def test_group_fused_with_neighbor_loop_of_previous_group(self):
+        # Given
+        pa = self.pa
+        pa.u[:] = 1.0
+        equations = [
+            Group(equations=[SumMass(dest='fluid', sources=['fluid'])]),
+            Group(equations=[ScaleEquation(dest='fluid', sources=None)]),
+        ]
+        a_eval = self._make_accel_eval(equations)
+
+        # When
+        a_eval.compute(0.1, 0.1)
+
+        # Then
+        expect = np.asarray([3., 4., 5., 5., 5., 5., 5., 5., 4., 3.])
+        self.assertListEqual(list(pa.au), list(expect))
+        self.assertListEqual(list(pa.av), list(expect + 2.0))
+
+
 class EqWithTime(Equation):
     def initialize(self, d_idx, d_au, t, dt):
         d_au[d_idx] = t + dt
@@ -16,7 +16,27 @@ from pysph.sph.acceleration_eval_cython_helper import (
 )
 from pysph.sph.acceleration_eval import AccelerationEval
 from pysph.sph.basic_equations import SummationDensity
-from pysph.sph.equation import Group
+from pysph.sph.equation import Equation, Group
+
+
+class EOS(Equation):
+    def loop(self, d_idx, d_rho, d_p):
+        d_p[d_idx] = d_rho[d_idx]
+
+
+class SmoothPressure(Equation):
+    def loop(self, d_idx, d_p):
+        d_p[d_idx] = 0.5*(d_p[d_idx - 1] + d_p[d_idx + 1])
+
+
+class PressureSum(Equation):
+    def loop(self, d_idx, d_u, s_idx, s_p):
+        d_u[d_idx] += s_p[s_idx]
+
+
+class ScaledPressureSum(PressureSum):
+    def post_loop(self, d_idx, d_u, d_rho):
+        d_u[d_idx] /= d_rho[d_idx]
 
 
 class TestGetAllArrayNames(unittest.TestCase):
@@ -109,3 +129,113 @@ class TestAccelerationHelperCython(unittest.TestCase):
         expect = ("prange(D_START_IDX, NP_DEST, 1, schedule='dynamic', "
                   "chunksize=64)")
         self.assertEqual(result, expect)
+
+    def test_kernel_code_is_specialized_for_kernel_attributes(self):
+        # Given
+        pa = ParticleArray(name='f', m=[1.0], rho=[0.0])
+        eqs = [SummationDensity(dest='f', sources=['f'])]
+        kernel = CubicSpline(dim=2)
+        aeval = AccelerationEval([pa], eqs, kernel=kernel)
+
+        # When
+        helper = AccelerationEvalCythonHelper(aeval)
+        result = helper.get_header()
+
+        # Then
+        self.assertNotIn('self.dim', result)
+        self.assertNotIn('self.fac', result)
+        self.assertIn('if 2 == 2:', result)
+        self.assertIn('%r * h1 * h1' % kernel.fac, result)
+
+    def test_equations_with_same_source_share_one_neighbor_loop(self):
+        # Given
+        fluid = ParticleArray(name='f', m=[1.0], rho=[0.0], p=[0.0], u=[0.0])
+        solid = ParticleArray(name='s', m=[1.0], rho=[0.0], p=[0.0])
+        eqs = [Group(equations=[
+            SummationDensity(dest='f', sources=['f', 's']),
+            PressureSum(dest='f', sources=['f']),
+            ScaledPressureSum(dest='f', sources=['f', 's']),
+        ])]
+        aeval = AccelerationEval([fluid, solid], eqs,
+                                 kernel=CubicSpline(dim=1))
+
+        # When
+        helper = AccelerationEvalCythonHelper(aeval)
+        code = helper.get_code()
+
+        # Then
+        # One neighbor loop for each source and one post loop pass.
+        self.assertEqual(code.count('for nbr_idx in range(N_NBRS):'), 2)
+        self.assertEqual(code.count('# Post loop for destination f.'), 1)
+        self.assertEqual(code.count('self.summation_density0.loop('), 2)
+        self.assertEqual(code.count('self.pressure_sum0.loop('), 1)
+        self.assertEqual(code.count('self.scaled_pressure_sum0.loop('), 2)
+
+
+class TestGroupFusion(unittest.TestCase):
+    def _make_helper(self, groups):
+        pa = ParticleArray(name='f', m=[1.0], rho=[0.0], p=[0.0], u=[0.0])
+        aeval = AccelerationEval([pa], groups, kernel=CubicSpline(dim=1))
+        return AccelerationEvalCythonHelper(aeval)
+
+    def test_destination_only_group_is_fused_with_previous_group(self):
+        # Given
+        groups = [
+            Group(equations=[SummationDensity(dest='f', sources=['f'])]),
+            Group(equations=[EOS(dest='f', sources=None)]),
+        ]
+
+        # When
+        helper = self._make_helper(groups)
+        mega_groups = helper.object.mega_groups
+        code = helper.get_code()
+
+        # Then
+        self.assertFalse(helper.is_fused(mega_groups[0]))
+        self.assertTrue(helper.is_fused(mega_groups[1]))
+        self.assertEqual(helper.get_fused_code(mega_groups[0], 'post_loop'),
+                         '')
+        self.assertIn('self.eos0.loop(d_idx, d_rho, d_p)',
+                      helper.get_fused_code(mega_groups[0], 'f'))
+        self.assertEqual(code.count('self.eos0.loop('), 1)
+
+    def test_group_with_pre_post_or_different_range_is_not_fused(self):
+        for kw in (dict(pre=lambda: None), dict(post=lambda: None),
+                   dict(real=False), dict(start_idx=1)):
+            # Given
+            groups = [
+                Group(equations=[SummationDensity(dest='f', sources=['f'])]),
+                Group(equations=[EOS(dest='f', sources=None)], **kw),
+            ]
+
+            # When
+            helper = self._make_helper(groups)
+
+            # Then
+            self.assertFalse(helper.is_fused(helper.object.mega_groups[1]))
+
+    def test_group_accessing_other_particles_is_not_fused(self):
+        # Given
+        groups = [
+            Group(equations=[SummationDensity(dest='f', sources=['f'])]),
+            Group(equations=[SmoothPressure(dest='f', sources=None)]),
+        ]
+
+        # When
+        helper = self._make_helper(groups)
+
+        # Then
+        self.assertFalse(helper.is_fused(helper.object.mega_groups[1]))
+
+    def test_group_writing_properties_used_by_sources_is_not_fused(self):
+        # Given
+        groups = [
+            Group(equations=[PressureSum(dest='f', sources=['f'])]),
+            Group(equations=[EOS(dest='f', sources=None)]),
+        ]
+
+        # When
+        helper = self._make_helper(groups)
+
+        # Then
+        self.assertFalse(helper.is_fused(helper.object.mega_groups[1]))
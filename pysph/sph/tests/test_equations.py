@@ -7,7 +7,8 @@ import unittest
 # Local imports.
 from compyle.api import KnownType
 from pysph.sph.equation import (
-    BasicCodeBlock, Context, CythonGroup, Equation, Group, sort_precomputed
+    BasicCodeBlock, Context, CythonGroup, Equation, Group, get_method_args,
+    sort_precomputed
 )
 
 
@@ -121,6 +122,19 @@ class TestEquations(TestBase):
         self.assertEqual(d_arho[0], 3.0)
         self.assertEqual(d_arho[1], 0.0)
 
+    def test_get_method_args_returns_a_fresh_list(self):
+        from pysph.sph.basic_equations import ContinuityEquation
+        e = ContinuityEquation(dest='fluid', sources=['fluid'])
+        expect = ['self', 'd_idx', 'd_arho', 's_idx', 's_m', 'DWIJ', 'VIJ']
+
+        args = get_method_args(e.loop)
+        self.assertEqual(args, expect)
+
+        # Modifying the result should not affect the cached value.
+        args.remove('self')
+        e1 = ContinuityEquation(dest='solid', sources=['fluid'])
+        self.assertEqual(get_method_args(e1.loop), expect)
+
     def test_order_of_precomputed(self):
         try:
             pre_comp = Group.pre_comp
@@ -233,10 +247,10 @@ class TestGroup(TestBase):
         g.get_equation_wrappers()
         result = g.get_loop_code(k)
         expect = dedent('''\
-            HIJ = 0.5*(d_h[d_idx] + s_h[s_idx])
-            XIJ[0] = d_x[d_idx] - s_x[s_idx]
-            XIJ[1] = d_y[d_idx] - s_y[s_idx]
-            XIJ[2] = d_z[d_idx] - s_z[s_idx]
+            HIJ = 0.5*(_d_h + s_h[s_idx])
+            XIJ[0] = _d_x - s_x[s_idx]
+            XIJ[1] = _d_y - s_y[s_idx]
+            XIJ[2] = _d_z - s_z[s_idx]
             R2IJ = XIJ[0]*XIJ[0] + XIJ[1]*XIJ[1] + XIJ[2]*XIJ[2]
             RIJ = sqrt(R2IJ)
             WIJ = self.kernel.kernel(XIJ, RIJ, HIJ)
@@ -247,6 +261,48 @@ class TestGroup(TestBase):
         msg = 'EXPECTED:\n%s\nGOT:\n%s' % (expect, result)
         self.assertEqual(result, expect, msg)
 
+    def test_hoisted_array_setup(self):
+        e1 = Equation1('f', ['f'])
+        g = CythonGroup([e1])
+        known_types = {'d_h': KnownType('float*')}
+
+        result = g.get_hoisted_array_setup()
+        expect = dedent('''\
+            _d_h = d_h[d_idx]
+            _d_x = d_x[d_idx]
+            _d_y = d_y[d_idx]
+            _d_z = d_z[d_idx]''')
+        self.assertEqual(result, expect)
+        self.assertEqual(
+            g.get_hoisted_array_declarations(known_types),
+            ['cdef float _d_h', 'cdef double _d_x', 'cdef double _d_y',
+             'cdef double _d_z']
+        )
+
+    def test_arrays_passed_to_loop_are_not_hoisted(self):
+        class Equation3(Equation):
+            def loop(self, d_idx, d_h, WIJ):
+                d_h[d_idx] += WIJ
+
+        from pysph.base.kernels import CubicSpline
+        g = CythonGroup([Equation1('f', ['f']), Equation3('f', ['f'])])
+        g.get_equation_wrappers()
+
+        self.assertNotIn('_d_h', g.get_hoisted_array_setup())
+        result = g.get_loop_code(CubicSpline(dim=3))
+        self.assertIn('HIJ = 0.5*(d_h[d_idx] + s_h[s_idx])', result)
+        self.assertIn('XIJ[0] = _d_x - s_x[s_idx]', result)
+
+    def test_kernel_symbols_are_replaced_as_whole_words(self):
+        from pysph.base.kernels import CubicSpline
+        g = CythonGroup([Equation1('f', ['f'])])
+        code = 'MY_KERNEL = KERNEL(XIJ, DELTAP*HIJ, HIJ) + DWDQ(RIJ, HIJ)'
+        result = g._set_kernel(code, CubicSpline(dim=3))
+        expect = ('MY_KERNEL = self.kernel.kernel('
+                  'XIJ, self.kernel.get_deltap()*HIJ, HIJ) + '
+                  'self.kernel.dwdq(RIJ, HIJ)')
+        self.assertEqual(result, expect)
+
     def test_post_loop_code(self):
         from pysph.base.kernels import CubicSpline
         k = CubicSpline(dim=3)